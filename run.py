@@ -1,7 +1,12 @@
+import logging
+
 from src.processor import process_files
-from src.plot_time_series import plot_global_mean_tas
+from src.plot_time_series import (compute_field_mean_tas,
+                                  plot_global_mean_tas_from_array)
 from src.processor import shift_initialization_time
 if __name__ == "__main__":
+    # Show the pipeline's progress messages; use DEBUG for per-file details
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     output_file = "/work/kd1418/codes/work/k202196/MYWORK/tas_Amon_seSEIKaSIVERAf2002_r28i11p2f1-LR_1960-2025_anomaly.nc"
     #process_files(
     #    experiment="dkfen4*",
@@ -22,13 +27,15 @@ if __name__ == "__main__":
         output_dir="./",
         subtract_clim=False
     )
-    plot_global_mean_tas(
-        output_file,
+    # Read and reduce the cube once, then plot it twice
+    fldmean_tas = compute_field_mean_tas(output_file, num_lead_years=11)
+    plot_global_mean_tas_from_array(
+        fldmean_tas,
         num_lead_years=2,
         output_plot=f"first_2_lead_month_with_mean.png",
     )
-    plot_global_mean_tas(
-        output_file,
+    plot_global_mean_tas_from_array(
+        fldmean_tas,
         num_lead_years=11,
         output_plot=f"first_11_lead_month_with_mean.png",
     )
@@ -1,6 +1,62 @@
+from typing import Optional
+
 import matplotlib.pyplot as plt
 import numpy as np
 import xarray as xr
+from matplotlib.collections import LineCollection
+
+# Fractional-year offset of each month within a 12-month block.
+_MONTH_FRAC = np.arange(12, dtype=np.float64) / 12.0
+
+
+def _field_mean(values: np.ndarray) -> np.ndarray:
+    """
+    Averages over the two trailing (lat, lon) axes.
+    Accumulates in float64: model output is usually float32, and the wider
+    accumulator is both more accurate and takes NumPy's vectorized path.
+    """
+    return values.mean(axis=(-2, -1), dtype=np.float64)
+
+
+def compute_field_mean_tas(
+    nc_file: str,
+    num_lead_years: Optional[int] = None
+) -> xr.DataArray:
+    """
+    Computes the field mean of tas for every initialization and lead time.
+
+    Parameters:
+        nc_file (str): Path to the NetCDF file.
+        num_lead_years (int, optional): Only reduce the first
+            `num_lead_years` lead years (all lead times if None).
+
+    Returns:
+        xr.DataArray: Field mean with dims (initialization, lead_time).
+    """
+    # One dask chunk per initialization so the spatial mean streams through
+    # the cube instead of loading it whole; compute once before plotting.
+    # lat/lon are the reduced core dims and must not be split, whatever the
+    # chunking on disk.
+    ds = xr.open_dataset(
+        nc_file, chunks={"initialization": 1, "lat": -1, "lon": -1}
+    )
+    tas = ds["tas"]
+    if num_lead_years is not None:
+        # Only the first `num_lead_years` years are plotted, so select them
+        # by position before reducing rather than averaging every lead time.
+        tas = tas.isel(lead_time=slice(0, num_lead_years * 12))
+    # Reduce each chunk independently on dask's thread pool.
+    fldmean_tas = xr.apply_ufunc(
+        _field_mean,
+        tas,
+        input_core_dims=[["lat", "lon"]],
+        dask="parallelized",
+        output_dtypes=[np.float64],
+        keep_attrs=True,
+    ).compute(scheduler="threads")
+    ds.close()
+
+    return fldmean_tas
 
 
 def plot_global_mean_tas(
@@ -21,55 +77,81 @@ def plot_global_mean_tas(
     Returns:
         None
     """
-    ds = xr.open_dataset(nc_file)
-    fldmean_tas = ds["tas"].mean(dim=["lat", "lon"])
-
-    yearly_data = {}
-    monthly_values = {}
+    fldmean_tas = compute_field_mean_tas(nc_file, num_lead_years)
+    plot_global_mean_tas_from_array(fldmean_tas, num_lead_years, output_plot)
 
-    for init_year in ds["initialization"]:
-        lead_times = fldmean_tas.sel(initialization=init_year)[
-            "lead_time"
-        ].values
-        block_range = range(0, min(len(lead_times), num_lead_years * 12), 12)
 
-        for block_start in block_range:
-            year = int(init_year.values) + block_start // 12
-            block = lead_times[block_start:block_start + 12]
-            tas_block = fldmean_tas.sel(
-                initialization=init_year, lead_time=block
-            ).values
+def plot_global_mean_tas_from_array(
+    fldmean_tas: xr.DataArray,
+    num_lead_years: int,
+    output_plot: str
+ ) -> None:
+    """
+    Same as `plot_global_mean_tas`, but for a field mean that was already
+    computed with `compute_field_mean_tas`, so several plots can share it.
 
-            if len(tas_block) < 12:
-                continue
+    Parameters:
+        fldmean_tas (xr.DataArray): Field mean of tas with dims
+            (initialization, lead_time).
+        num_lead_years (int): Number of lead years to plot.
+        output_plot (str): Path to save the output plot.
 
-            yearly_data.setdefault(year, []).append(tas_block)
+    Returns:
+        None
+    """
+    # Cut every initialization into complete 12-month blocks in one reshape
+    # instead of selecting each block by label.
+    arr = fldmean_tas.transpose("initialization", "lead_time").values
+    n_init = arr.shape[0]
+    n_years = min(arr.shape[1] // 12, num_lead_years)
+    blocks = arr[:, :n_years * 12].reshape(n_init, n_years, 12)
 
-            for month_idx, temp_value in enumerate(tas_block):
-                actual_time = year + month_idx / 12
-                monthly_values.setdefault(actual_time, []).append(temp_value)
+    init_years = fldmean_tas["initialization"].values.astype(int)
+    years_mat = init_years[:, None] + np.arange(n_years)[None, :]
 
     plt.figure(figsize=(14, 7))
-
-    for year, tas_blocks in yearly_data.items():
-        for tas_block in tas_blocks:
-            plt.plot(
-                [year + (month - 1) / 12 for month in range(1, 13)],
-                tas_block,
-                "k-",
-                alpha=0.5,
-            )
-
-    mean_x_vals = []
-    mean_y_vals = []
-
-    for time_point, values in sorted(monthly_values.items()):
-        if len(values) > 2:
-            mean_x_vals.append(time_point)
-            mean_y_vals.append(np.mean(values))
+    ax = plt.gca()
+
+    # Draw all 12-month blocks as one artist rather than one line each,
+    # building the segments straight from the (init, year, month) blocks.
+    segs = np.empty((n_init * n_years, 12, 2))
+    segs[:, :, 0] = years_mat.reshape(-1, 1) + _MONTH_FRAC[None, :]
+    segs[:, :, 1] = blocks.reshape(-1, 12)
+
+    # Rasterize the overlapping block lines; the mean line stays vector.
+    ax.add_collection(
+        LineCollection(
+            segs,
+            colors="k",
+            alpha=0.5,
+            linewidths=1,
+            rasterized=True,
+            zorder=1,
+        )
+    )
+    ax.autoscale_view()
+
+    # Average all values falling on the same calendar month in one pass:
+    # every month gets an integer index counted from the first year.
+    first_year = init_years.min()
+    month_offsets = (years_mat - first_year) * 12
+    time_idx = (month_offsets[:, :, None] + np.arange(12)).reshape(-1)
+    vals = blocks.reshape(-1)
+    n_months = (n_years + init_years.max() - first_year) * 12
+    counts = np.bincount(time_idx, minlength=n_months)
+    sums = np.bincount(time_idx, weights=vals, minlength=n_months)
+
+    mask = counts > 2
+    mean_x_vals = first_year + np.flatnonzero(mask) / 12
+    mean_y_vals = sums[mask] / counts[mask]
 
     plt.plot(
-        mean_x_vals, mean_y_vals, "r-", linewidth=2, label="Mean (if N > 2)"
+        mean_x_vals,
+        mean_y_vals,
+        "r-",
+        linewidth=2,
+        label="Mean (if N > 2)",
+        zorder=2,
     )
     plt.xlabel("Year")
     plt.ylabel("Field Mean of tas (K)")
@@ -1,21 +1,50 @@
+import glob
+import hashlib
+import logging
+import multiprocessing
 import os
+import re
 import subprocess
-from typing import List
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from typing import Callable, Iterator, List, Optional, Tuple, Union
 
 import cftime
+import dask.array as da
 import freva
 import numpy as np
 import pandas as pd
 import xarray as xr
 from tqdm import tqdm
 
+logger = logging.getLogger(__name__)
+
+# Time period encoded at the end of CMOR file names, e.g. `_196011-197012.nc`
+_PERIOD_RE = re.compile(r"_(\d{4})\d{2}-(\d{4})\d{2}\.nc$")
+
+# Dask chunks for the input files: one year of full fields per block, so
+# the anomalies stream through memory a year at a time.
+_INPUT_CHUNKS = {"time": 12, "lat": -1, "lon": -1}
+
+# How the input files are opened: times are decoded by hand
+# (`decode_months`) and coordinate attributes (bounds, height, ...) are
+# never used, so xarray skips both. Masking and scaling stay on.
+_OPEN_KWARGS = {
+    "decode_times": False,
+    "decode_coords": False,
+    "chunks": _INPUT_CHUNKS,
+}
+
 
 def shift_initialization_time(nc_file: str, output_file: str) -> None:
     """
     Shifts the initialization time from January (01) to November (11)
     in a NetCDF file.
     """
-    print(f"🔄 Shifting initialization time in {nc_file}")
+    logger.info("🔄 Shifting initialization time in %s", nc_file)
 
     ds = xr.open_dataset(nc_file)
 
@@ -40,27 +69,29 @@ def shift_initialization_time(nc_file: str, output_file: str) -> None:
 
         # Save the modified dataset
         ds.to_netcdf(output_file)
-        print(f"✅ Shifted initialization times saved to {output_file}")
+        logger.info("✅ Shifted initialization times saved to %s", output_file)
 
     else:
-        print("⚠️ No 'initialization' coordinate found in the dataset!")
+        logger.warning(
+            "⚠️ No 'initialization' coordinate found in the dataset!"
+        )
 
     ds.close()
 
 
-def find_nc_files(
+def iter_nc_files(
     experiment: str,
     project: str, time_frequency: str, variable: str, ensemble: str
-) -> List[str]:
-    """Finds NetCDF files using Freva's databrowser."""
-    print("🔍 Searching for NetCDF files with parameters:")
-    print(
-        f"   Experiment: {experiment}, Project: {project}",
-        f"   Time Frequency: {time_frequency}",
-        f"   Variable: {variable}, Ensemble: {ensemble}"
+) -> Iterator[str]:
+    """Yields NetCDF files from Freva's databrowser as they are found."""
+    logger.info(
+        "🔍 Searching for NetCDF files with parameters:"
+        " Experiment: %s, Project: %s, Time Frequency: %s,"
+        " Variable: %s, Ensemble: %s",
+        experiment, project, time_frequency, variable, ensemble,
     )
 
-    results = list(
+    return iter(
         freva.databrowser(
             experiment=experiment,
             project=project,
@@ -70,167 +101,452 @@ def find_nc_files(
         )
     )
 
+
+def _report_found(results: List[str]) -> List[str]:
+    """Logs how many files a Freva search found and returns them."""
     if not results:
-        print("⚠️ Warning: No files found with the given parameters.")
+        logger.warning("⚠️ No files found with the given parameters.")
     else:
-        print(f"✅ Found {len(results)} files.")
+        logger.info("✅ Found %d files.", len(results))
 
     return results
 
 
+def find_nc_files(
+    experiment: str,
+    project: str, time_frequency: str, variable: str, ensemble: str
+) -> List[str]:
+    """Finds NetCDF files using Freva's databrowser."""
+    return _report_found(
+        list(
+            iter_nc_files(
+                experiment, project, time_frequency, variable, ensemble
+            )
+        )
+    )
+
+
+def _content_key(file: str, block_size: int = 2**20) -> str:
+    """
+    Short sha256 of the content of `file`, so copies or re-downloads of
+    the same file share cached products.
+    """
+    key = hashlib.sha256()
+    with open(file, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            key.update(block)
+    return key.hexdigest()[:12]
+
+
+def _grid_key(reference_file: str) -> str:
+    """
+    Short hash of the lat/lon coordinates of `reference_file`, so files on
+    the same grid share cached regridded products.
+    """
+    key = hashlib.sha1()
+    with xr.open_dataset(reference_file, decode_times=False) as ds:
+        for name in ("lat", "lon"):
+            values = np.ascontiguousarray(ds[name].values)
+            key.update(f"{name}:{values.dtype}:{values.shape};".encode())
+            key.update(values.tobytes())
+    return key.hexdigest()[:12]
+
+
+def _cache_key(climatology_file: str, reference_file: str) -> str:
+    """
+    Key of the products cached for regridding `climatology_file` onto the
+    grid of `reference_file`: the grid and the climatology's content.
+    """
+    return f"{_grid_key(reference_file)}_{_content_key(climatology_file)}"
+
+
+def _weights_file(directory: str, backend: str, key: str) -> str:
+    """Path of the cached bilinear weights of `backend` for `key`."""
+    prefix = "xesmf_bilinear" if backend == "xesmf" else "bilweights"
+    return os.path.join(directory, f"{prefix}_{key}.nc")
+
+
+def _write_atomically(path: str, write: Callable[[str], None]) -> None:
+    """
+    Calls `write` with a temporary path next to `path` and moves the
+    result to `path` once complete, so an interrupted run never leaves a
+    partial file behind that later runs would reuse.
+    - The temporary path is unique to this call, so concurrent runs sharing
+      a directory never write the same partial file, and it is removed
+      whether or not `write` succeeds.
+    """
+    with tempfile.TemporaryDirectory(
+        dir=os.path.dirname(path) or ".", prefix=".partial-"
+    ) as partial_dir:
+        partial_path = os.path.join(partial_dir, os.path.basename(path))
+        write(partial_path)
+        os.replace(partial_path, path)
+
+
 def adjust_climatology(
-    climatology_file: str, reference_file: str, output_file: str
+    climatology_file: str,
+    reference_file: str,
+    output_file: str,
+    backend: str = "cdo",
+    weights_file: Optional[str] = None,
 ) -> None:
     """
     Adjusts the climatology file to match the reference file in grid,
     levels, and time axis.
+    - `backend="cdo"` runs `cdo remapbil` + `cdo ymonmean`.
+    - `backend="xesmf"` regrids in-process with xESMF.
+    - The bilinear weights are stored in `weights_file` (by default next to
+      `output_file`, keyed by the reference grid and the climatology's
+      content) and reused on later runs.
     """
-    print(
-        f"📌 Adjusting climatology {climatology_file}",
-        f"   to match {reference_file}")
+    if backend not in ("cdo", "xesmf"):
+        raise ValueError(
+            f"❌ Unknown regridding backend '{backend}'"
+            " (expected 'cdo' or 'xesmf')."
+        )
+    logger.info(
+        "📌 Adjusting climatology %s to match %s",
+        climatology_file, reference_file,
+    )
+    if weights_file is None:
+        weights_file = _weights_file(
+            os.path.dirname(output_file),
+            backend,
+            _cache_key(climatology_file, reference_file),
+        )
 
-    remapped_grid_file = output_file.replace(".nc", "_grid.nc")
-    subprocess.run(
-        ["cdo", "remapbil," +
-            reference_file, climatology_file, remapped_grid_file],
-        check=True,
+    if backend == "xesmf":
+        _adjust_climatology_xesmf(
+            climatology_file, reference_file, output_file, weights_file
+        )
+    else:
+        # Generate the bilinear weights once per pair of grids and reuse
+        # them on later runs instead of recomputing them in `remapbil`.
+        if not os.path.exists(weights_file):
+            _write_atomically(
+                weights_file,
+                lambda path: subprocess.run(
+                    ["cdo", "genbil," + reference_file,
+                        climatology_file, path],
+                    check=True,
+                ),
+            )
+
+        # Chain remap and ymonmean in one CDO call so the remapped field is
+        # piped in memory instead of written to and read back from disk.
+        subprocess.run(
+            ["cdo", "-O", "ymonmean",
+                f"-remap,{reference_file},{weights_file}",
+                climatology_file, output_file],
+            check=True,
+        )
+
+    logger.info("✅ Adjusted climatology saved as %s", output_file)
+
+
+def _adjust_climatology_xesmf(
+    climatology_file: str,
+    reference_file: str,
+    output_file: str,
+    weights_file: str,
+) -> None:
+    """
+    Bilinear remap + monthly mean of the climatology with xESMF/xarray.
+    The result keeps a 12-step 'time' axis, like `cdo ymonmean`.
+    """
+    # Optional dependency, only needed for this backend
+    import xesmf as xe
+
+    clim = xr.open_dataset(climatology_file, chunks={})
+    ref = xr.open_dataset(reference_file, decode_times=False)
+
+    # Only regrid fields on the horizontal grid (skips e.g. time_bnds)
+    clim = clim[
+        [v for v in clim.data_vars if {"lat", "lon"} <= set(clim[v].dims)]
+    ]
+
+    reuse_weights = os.path.exists(weights_file)
+    regridder = xe.Regridder(
+        clim,
+        ref,
+        "bilinear",
+        weights=weights_file if reuse_weights else None,
+    )
+    if not reuse_weights:
+        _write_atomically(weights_file, regridder.to_netcdf)
+
+    clim_ymon = (
+        regridder(clim, keep_attrs=True)
+        .groupby("time.month")
+        .mean("time")
+        .rename({"month": "time"})
     )
+    clim_ymon.to_netcdf(output_file)
 
-    subprocess.run(["cdo",
-                    "ymonmean",
-                    remapped_grid_file,
-                    output_file],
-                   check=True)
+    clim.close()
+    ref.close()
 
-    os.remove(remapped_grid_file)
 
-    print(f"✅ Adjusted climatology saved as {output_file}")
+def _adjusted_climatology(
+    climatology_file: str,
+    reference_file: str,
+    output_dir: str,
+    backend: str = "cdo",
+) -> Tuple[str, str]:
+    """
+    Runs `adjust_climatology` unless an earlier run already produced it.
+    - The output and the regridding weights are keyed by the reference
+      grid, the content of the climatology file and the backend, so runs
+      for other variables or ensemble members on the same grid reuse them.
+    - Returns the paths of the adjusted climatology and of the weights.
+    """
+    key = _cache_key(climatology_file, reference_file)
+    output_file = os.path.join(
+        output_dir, f"adjusted_climatology_{backend}_{key}.nc"
+    )
+    weights_file = _weights_file(output_dir, backend, key)
+    if os.path.exists(output_file):
+        logger.info("♻️ Reusing adjusted climatology %s", output_file)
+    else:
+        _write_atomically(
+            output_file,
+            partial(
+                adjust_climatology,
+                climatology_file,
+                reference_file,
+                backend=backend,
+                weights_file=weights_file,
+            ),
+        )
+    return output_file, weights_file
 
 
-def subtract_climatology(
-    input_file: str, climatology_file: str, output_file: str, variable: str
-) -> xr.Dataset:
+def load_climatology(climatology_file: str, variable: str) -> np.ndarray:
     """
-    Subtracts the monthly climatology from the input dataset.
-    - Replaces 'time' with 'lead_time' (1 to 122).
-    - Adjusts the time axis to start from November (YYYY-11-01).
-    - Returns the anomalies as an xarray Dataset.
+    Loads an adjusted climatology as a float32 (12, lat, lon) array, one
+    slab per calendar month.
     """
-    print(f"📉 Subtracting monthly climatology for {input_file}")
+    with xr.open_dataset(climatology_file) as clim:
+        if "time" not in clim.dims or len(clim.time) != 12:
+            raise ValueError(
+                "❌ Climatology file must contain exactly 12 monthly means.")
 
-    ds = xr.open_dataset(input_file, decode_times=False)
-    clim = xr.open_dataset(climatology_file)
+        return clim[variable].values.astype(np.float32, copy=False)
 
-    if "time" not in clim.dims or len(clim.time) != 12:
-        raise ValueError(
-            "❌ Climatology file must contain exactly 12 monthly means.")
 
+def _decode_calendar(
+    ds: xr.Dataset, november_start: bool = True
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the year and calendar month (1-12) of every timestep of a
+    dataset opened with `decode_times=False`.
+    - With `november_start`, 'months since' axes are counted from November
+      (YYYY-11-01) as the hindcasts are initialized; otherwise from the
+      base date in their units.
+    """
     time_var = ds["time"]
     time_units = time_var.attrs["units"]
 
     if "months since" in time_units:
-        print(f"🕒 Manually fixing 'months since' format in {input_file}")
+        logger.debug(
+            "🕒 Manually fixing 'months since' format in %s",
+            ds.encoding.get("source", "dataset"),
+        )
 
         base_time_str = time_units.split("since")[-1].strip()
         base_date = pd.to_datetime(base_time_str)
 
-        # Adjust the base date to start from November (YYYY-11-01)
-        base_date = base_date.replace(month=11, day=1)
+        if november_start:
+            # Adjust the base date to start from November (YYYY-11-01)
+            base_date = base_date.replace(month=11, day=1)
+
+        # Month arithmetic on the whole offset array at once. Only the
+        # calendar month and year are needed downstream, and the time axis
+        # is dropped afterwards, so no datetime objects are built.
+        offsets = time_var.values.astype(np.int64, copy=False)
+        total_months = (base_date.month - 1) + offsets
+        years = base_date.year + total_months // 12
+        months = total_months % 12 + 1
+    else:
+        decoded_time = xr.decode_cf(ds[["time"]])["time"]
+        years = decoded_time.dt.year.values
+        months = decoded_time.dt.month.values
 
-        time_values = [
-            base_date + pd.DateOffset(months=int(t)) for t in time_var.values
-        ]
+    return years, months
 
-        time_values_cftime = [
-            cftime.DatetimeProlepticGregorian(t.year, t.month, t.day)
-            for t in time_values
-        ]
 
-        ds = ds.assign_coords(time=("time", time_values_cftime))
+def decode_months(ds: xr.Dataset) -> Tuple[np.ndarray, int]:
+    """
+    Returns the calendar month (1-12) of every timestep of a dataset opened
+    with `decode_times=False`, and the first year of its time axis.
+    - The months of 'months since' axes are counted from November
+      (YYYY-11-01).
+    - The year is read on the real calendar, like `cdo showyear`, so it
+      matches `extract_years_from_file`.
+    """
+    _, months = _decode_calendar(ds)
+    years, _ = _decode_calendar(
+        ds.isel(time=slice(0, 1)), november_start=False
+    )
+    return months, int(years[0])
 
-    ds_months = ds["time"].dt.month
-    anomalies = np.zeros_like(ds[variable].values)
-    
-    # Add progress bar for climatology subtraction
-    print("\n🔄 Subtracting climatology for each timestep:")
-    for i, month in enumerate(tqdm(ds_months, desc="Processing timesteps", unit="step")):
-        clim_month = clim[variable].isel(
-            time=month - 1  # Climatology file is assumed to have months 1-12
+
+def _subtract_monthly(
+    data: np.ndarray, months: np.ndarray, clim_by_month: np.ndarray
+) -> np.ndarray:
+    """
+    Subtracts the monthly climatology from a (time, lat, lon) block.
+    - `months` holds the calendar month (1-12) of every timestep and
+      `clim_by_month` the matching (12, lat, lon) climatology block.
+    - Gathers the climatology straight into the float32 output buffer and
+      subtracts in place, so a block costs one allocation.
+    """
+    anomalies = np.empty(data.shape, dtype=np.float32)
+    # `mode="clip"` lets `take` write into `out` without a bounds-checked
+    # intermediate copy; months are always 1-12 here.
+    np.take(clim_by_month, months - 1, axis=0, out=anomalies, mode="clip")
+    np.subtract(data, anomalies, out=anomalies, dtype=np.float32)
+    return anomalies
+
+
+def _monthly_anomalies(
+    field: xr.DataArray, months: np.ndarray, clim_by_month: np.ndarray
+) -> xr.DataArray:
+    """
+    Float32 anomalies of a (time, lat, lon) field against a (12, lat, lon)
+    monthly climatology, kept lazy when `field` is dask-backed.
+    - Anomalies are float32: half the memory traffic of float64, and far
+      more precision than the ~1e-4 K the analysis needs.
+    """
+    data = field.data
+    if isinstance(data, da.Array):
+        # Hand every block the months of its timesteps and the climatology
+        # cut to its lat/lon extent, keeping the climatology month-major so
+        # each month is a contiguous plane.
+        anomalies = da.blockwise(
+            _subtract_monthly, "tyx",
+            data, "tyx",
+            da.from_array(months, chunks=(data.chunks[0],)), "t",
+            da.from_array(clim_by_month, chunks=(12,) + data.chunks[1:]),
+            "myx",
+            concatenate=True,
+            dtype=np.float32,
         )
-        anomalies[i] = ds[variable].isel(time=i).values - clim_month.values
+    else:
+        anomalies = _subtract_monthly(data, months, clim_by_month)
+
+    return xr.DataArray(
+        anomalies,
+        dims=field.dims,
+        coords=field.coords,
+        attrs=field.attrs,
+        name=field.name,
+    )
 
-    ds_anomalies = ds.copy()
-    ds_anomalies[variable].values = anomalies
+
+def subtract_climatology(
+    input_file: Union[str, xr.Dataset],
+    climatology_file: Union[str, np.ndarray],
+    variable: str,
+) -> Tuple[xr.Dataset, int]:
+    """
+    Subtracts the monthly climatology from the input dataset.
+    - `input_file` is a path or a dataset already opened with
+      `decode_times=False`, so callers never have to open a file twice.
+    - `climatology_file` is a path or the (12, lat, lon) array returned by
+      `load_climatology`, so it can be loaded once for many inputs.
+    - Replaces 'time' with 'lead_time' (1 to 122).
+    - Adjusts the time axis to start from November (YYYY-11-01).
+    - Returns the anomalies as an xarray Dataset and the first year of the
+      decoded time axis; nothing is written to disk.
+    """
+    if isinstance(input_file, xr.Dataset):
+        ds = input_file
+        source = ds.encoding.get("source", "dataset")
+    else:
+        # Open the input lazily: the subtraction below becomes a dask graph
+        # that is only evaluated when the caller reads the anomalies.
+        ds = xr.open_dataset(input_file, **_OPEN_KWARGS)
+        source = input_file
+    logger.debug("📉 Subtracting monthly climatology for %s", source)
+
+    if isinstance(climatology_file, np.ndarray):
+        clim_by_month = climatology_file
+    else:
+        # Climatology file is assumed to have months 1-12: keep it as a
+        # (12, lat, lon) array and index it by month only.
+        clim_by_month = load_climatology(climatology_file, variable)
+
+    ds_months, first_year = decode_months(ds)
+
+    anomalies = _monthly_anomalies(ds[variable], ds_months, clim_by_month)
 
     # Replace 'time' with 'lead_time' (1 to 122)
-    ds_anomalies = ds_anomalies.assign_coords(
-        lead_time=("time", np.arange(1, len(ds_anomalies.time) + 1))
+    anomalies = anomalies.assign_coords(
+        lead_time=("time", np.arange(1, len(ds.time) + 1))
     ).drop_vars("time")
 
-    ds.close()
-    clim.close()
-
-    return ds_anomalies
+    # Only the variable is needed downstream: return it on its own instead
+    # of carrying bounds and other variables (or mutating a caller's `ds`).
+    ds_anomalies = anomalies.to_dataset(name=variable)
+    ds_anomalies.attrs = ds.attrs
+    # The anomalies may still be lazy, so closing the returned dataset (done
+    # by the caller) closes the input file.
+    ds_anomalies.set_close(ds.close)
+    return ds_anomalies, first_year
 
 
-def reorganize_to_4d(
-    ds: xr.Dataset, variable: str, n_initializations: int, n_lead_times: int
+def _preprocess_lazy(
+    ds: xr.Dataset, variable: str, clim_by_month: Optional[np.ndarray]
 ) -> xr.Dataset:
     """
-    Reorganizes a 3D dataset (time, lat, lon) into a 4D dataset
-     (initialization, lead_time, lat, lon).
-    - `n_initializations` is the number of files (initializations).
-    - `n_lead_times` is the length of the time dimension in each file.
+    `open_mfdataset` preprocessing for `process_files(lazy=True)`.
+    - Subtracts `clim_by_month` (12, lat, lon) when given.
+    - Drops the per-file time axis and labels the file with its first year
+      along a new 'initialization' dimension.
     """
-    print(f"📊 Input dataset dimensions: {ds.dims}")
-    print(f"📊 Input dataset shape: {ds[variable].shape}")
+    months, first_year = decode_months(ds)
 
-    try:
-        data_4d = ds[variable].values.reshape(
-            n_initializations, n_lead_times, ds.lat.size, ds.lon.size
-        )
-    except ValueError as e:
-        print(f"❌ Reshaping failed: {e}")
-        print(
-            f"❌ Expected shape: ({n_initializations}",
-            f" {n_lead_times}, {ds.lat.size}, {ds.lon.size})"
-        )
-        print(f"❌ Actual size: {ds[variable].values.size}")
-        raise
+    field = ds[variable]
+    if clim_by_month is not None:
+        field = _monthly_anomalies(field, months, clim_by_month)
 
-    initializations = np.arange(n_initializations)
-    lead_times = np.arange(n_lead_times)
-
-    ds_4d = xr.Dataset(
-        {variable: (("initialization", "lead_time", "lat", "lon"), data_4d)},
-        coords={
-            "initialization": initializations,
-            "lead_time": lead_times,
-            "lat": ds.lat,
-            "lon": ds.lon,
-        },
+    return (
+        field.drop_vars("time")
+        .to_dataset()
+        .expand_dims(initialization=[first_year])
     )
 
-    return ds_4d
-
 
 def extract_years_from_file(file: str) -> List[int]:
     """
-    Extracts the years from a NetCDF file using `cdo showyear`.
+    Extracts the years from a NetCDF file.
+    - Uses the `_YYYYMM-YYYYMM.nc` period in CMOR-style file names.
+    - Falls back to reading the time axis of files without such a period.
     """
-    try:
-        result = subprocess.run(
-            ["cdo", "showyear", file],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        years = list(map(int, result.stdout.strip().split()))
-        return years
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error running `cdo showyear` on {file}: {e.stderr}")
-        raise
+    match = _PERIOD_RE.search(os.path.basename(file))
+    if match:
+        first_year, last_year = int(match.group(1)), int(match.group(2))
+        return list(range(first_year, last_year + 1))
+
+    # Read the time axis in-process instead of spawning `cdo showyear`, on
+    # its real calendar like CDO (no November initialization shift)
+    with xr.open_dataset(file, decode_times=False) as ds:
+        years, _ = _decode_calendar(ds, november_start=False)
+    return np.unique(years).tolist()
+
+
+def iter_nc_files_manual(
+    directory: str, pattern: str = "*.nc"
+) -> Iterator[str]:
+    """
+    Yields NetCDF files in a directory as they are found, unsorted.
+    - `**` in `pattern` (e.g. "**/*.nc") also searches the subdirectories.
+    """
+    logger.info("🔍 Searching for NetCDF files in directory: %s", directory)
+
+    # glob walks the directories with os.scandir, one listing per directory
+    return glob.iglob(os.path.join(directory, pattern), recursive=True)
 
 
 def find_nc_files_manual(directory: str, pattern: str = "*.nc") -> List[str]:
@@ -238,29 +554,89 @@ def find_nc_files_manual(directory: str, pattern: str = "*.nc") -> List[str]:
     
     Args:
         directory: Path to the directory containing NetCDF files
-        pattern: File pattern to match (default: "*.nc")
+        pattern: File pattern to match, "**" matches subdirectories
+            (default: "*.nc")
         
     Returns:
         List of file paths
     """
-    print(f"🔍 Searching for NetCDF files in directory: {directory}")
-    
-    import glob
-    import os
-    
-    # Ensure the path ends with a separator
-    directory = os.path.join(directory, "")
-    
-    # Find all matching files
-    search_pattern = os.path.join(directory, pattern)
-    results = glob.glob(search_pattern)
-    
+    # Sort straight from the generator instead of building a list first
+    results = sorted(iter_nc_files_manual(directory, pattern))
+
     if not results:
-        print("⚠️ Warning: No files found in the given directory.")
+        logger.warning("⚠️ No files found in the given directory.")
     else:
-        print(f"✅ Found {len(results)} files.")
-    
-    return sorted(results)
+        logger.info("✅ Found %d files.", len(results))
+
+    return results
+
+
+def _open_one(
+    file: str,
+    variable: str,
+    clim_by_month: Optional[np.ndarray] = None,
+    engine: Optional[str] = None,
+) -> Tuple[xr.Dataset, int]:
+    """
+    Opens one initialization file for `process_files`, lazily.
+    - Subtracts the (12, lat, lon) `clim_by_month` when given, otherwise
+      keeps the raw data.
+    - Returns the dask-backed dataset and its first year.
+    """
+    # Open every file exactly once; both branches read the year from the
+    # same handle, without decoding the whole time axis.
+    ds = xr.open_dataset(file, engine=engine, **_OPEN_KWARGS)
+    if clim_by_month is not None:
+        ds, year = subtract_climatology(ds, clim_by_month, variable)
+    else:
+        _, year = decode_months(ds)
+
+    return ds, year
+
+
+def _load_one(
+    file: str,
+    variable: str,
+    clim_by_month: Optional[np.ndarray] = None,
+    engine: Optional[str] = None,
+) -> Tuple[int, np.ndarray, xr.DataArray, xr.DataArray]:
+    """
+    Loads one initialization file for `process_files` into memory.
+    - Returns the first year, the (time, lat, lon) data, lat and lon.
+    """
+    ds, year = _open_one(file, variable, clim_by_month, engine=engine)
+
+    data = ds[variable].values
+    lat, lon = ds.lat.load(), ds.lon.load()
+    ds.close()
+
+    return year, data, lat, lon
+
+
+def _output_chunksizes(
+    n_lead_times: int,
+    n_lat: int,
+    n_lon: int,
+    itemsize: int,
+    max_bytes: int = 16 * 2**20,
+) -> Tuple[int, int, int, int]:
+    """
+    Chunk shape for the (initialization, lead_time, lat, lon) output.
+    - One initialization and all lead times per chunk.
+    - Halves the lat/lon extent until a chunk is at most `max_bytes`
+      (16 MiB by default), so high-resolution grids stay readable in parts.
+    """
+    chunk_lat, chunk_lon = n_lat, n_lon
+    while (
+        n_lead_times * chunk_lat * chunk_lon * itemsize > max_bytes
+        and (chunk_lat > 1 or chunk_lon > 1)
+    ):
+        if chunk_lat >= chunk_lon:
+            chunk_lat = (chunk_lat + 1) // 2
+        else:
+            chunk_lon = (chunk_lon + 1) // 2
+
+    return 1, n_lead_times, chunk_lat, chunk_lon
 
 
 def process_files(
@@ -279,6 +655,14 @@ def process_files(
     # Climatology parameters (optional)
     climatology_file: str = None,
     subtract_clim: bool = True,
+    regrid_backend: str = "cdo",
+    max_workers: Optional[int] = None,
+    lazy: bool = False,
+    time_last: bool = False,
+    chunksizes: Optional[Tuple[int, int, int, int]] = None,
+    complevel: int = 1,
+    engine: Optional[str] = None,
+    clear_cache: bool = False,
 ) -> None:
     """
     Processes NetCDF files into a 4D dataset (initialization, lead_time, lat, lon).
@@ -288,7 +672,10 @@ def process_files(
     Args:
         output_file: Path to save the final processed file
         output_dir: Directory to store intermediate files
-        cleanup: Whether to remove intermediate files
+        cleanup: Deprecated, has no effect: partial files are removed as
+            soon as they are written or fail, and the cached adjusted
+            climatology and regridding weights are kept for later runs.
+            Use clear_cache to remove them
         experiment: (Freva) Experiment name
         project: (Freva) Project name
         time_frequency: (Freva) Time frequency
@@ -298,113 +685,270 @@ def process_files(
         file_pattern: Pattern to match files when using manual search
         climatology_file: Path to climatology file (required if subtract_clim=True)
         subtract_clim: Whether to subtract climatology (default: True)
+        regrid_backend: Tool used to regrid the climatology, "cdo" or
+            "xesmf" (default: "cdo")
+        max_workers: Number of worker processes loading files in parallel
+            (default: number of CPUs, at most one per file). With more
+            than one worker and file, the workers are spawned, so scripts
+            calling this must guard their entry point with
+            `if __name__ == "__main__":`; with one, files are loaded in
+            this process
+        lazy: Stream the inputs to the output file with dask instead of
+            assembling the whole 4D array in memory; all files must then
+            have the same number of time steps (default: False)
+        time_last: Write the output as (initialization, lat, lon, lead_time)
+            so single grid-point time series are contiguous on disk
+            (default: False)
+        chunksizes: NetCDF chunk shape of the output variable, in output
+            dimension order (default: one initialization and all lead
+            times per chunk, at most 16 MiB)
+        complevel: zlib compression level of the output (default: 1)
+        engine: xarray backend used to read the input files, e.g.
+            "h5netcdf" where installed (default: xarray's choice)
+        clear_cache: Also remove this run's cached adjusted climatology
+            and regridding weights, so the next run regrids it again
+            (default: False)
     """
+    if cleanup:
+        warnings.warn(
+            "cleanup has no effect and will be removed; pass"
+            " clear_cache=True to remove the cached climatology and weights",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+    if subtract_clim and not climatology_file:
+        raise ValueError(
+            "climatology_file must be provided when subtract_clim=True"
+        )
+    adjusted_climatology = weights_file = None
+    clim_future = None
+
     # Find input files
     if input_directory is not None:
         files = find_nc_files_manual(input_directory, file_pattern)
     elif all([experiment, project, time_frequency, variable, ensemble]):
-        files = find_nc_files(
+        found = iter_nc_files(
             experiment,
             project,
             time_frequency,
             variable,
             ensemble)
+        first_file = next(found, None)
+        # Leaving the block joins the background regrid, also when listing
+        # the remaining files fails.
+        with ThreadPoolExecutor(max_workers=1) as background:
+            if first_file is not None and subtract_clim:
+                # The climatology only needs the first file's grid: regrid
+                # it in the background while the databrowser lists the
+                # remaining files.
+                os.makedirs(output_dir, exist_ok=True)
+                clim_future = background.submit(
+                    _adjusted_climatology,
+                    climatology_file,
+                    first_file,
+                    output_dir,
+                    backend=regrid_backend,
+                )
+            files = _report_found(
+                [] if first_file is None else [first_file, *found]
+            )
+            if clim_future is not None:
+                adjusted_climatology, weights_file = clim_future.result()
     else:
         raise ValueError(
             "Either input_directory or all Freva parameters must be provided"
         )
 
     if not files:
-        print("❌ No NetCDF files found. Exiting.")
+        logger.error("❌ No NetCDF files found. Exiting.")
         return
 
     os.makedirs(output_dir, exist_ok=True)
 
     # Process climatology if needed
-    if subtract_clim:
-        if not climatology_file:
-            raise ValueError(
-                "climatology_file must be provided when subtract_clim=True"
-            )
-        adjusted_climatology = os.path.join(output_dir, "adjusted_climatology.nc")
-        adjust_climatology(climatology_file, files[0], adjusted_climatology)
+    if subtract_clim and adjusted_climatology is None:
+        adjusted_climatology, weights_file = _adjusted_climatology(
+            climatology_file,
+            files[0],
+            output_dir,
+            backend=regrid_backend,
+        )
 
-    anomaly_files = []
     years = []
-    
-    # Add progress bar for file processing
-    print("\n🔄 Processing files:")
-    for file in tqdm(files, desc="Processing files", unit="file"):
-        if subtract_clim:
-            anomaly_file = os.path.join(
-                output_dir, 
-                os.path.basename(file).replace(".nc", "_anomaly.nc")
-            )
-            ds_anomalies = subtract_climatology(
-                file, adjusted_climatology, anomaly_file, variable
-            )
-        else:
-            # If not subtracting climatology, just open the file directly
-            ds_anomalies = xr.open_dataset(file)
-
-        anomaly_files.append(ds_anomalies)
-        file_years = extract_years_from_file(file)
-        years.append(file_years[0])
-
-    print(f"\n📊 Extracted years: {years}")
-
-    unique_time_steps = {len(ds.time) for ds in anomaly_files}
-    print(f"📊 Unique time step counts in anomaly files: {unique_time_steps}")
-
-    if len(unique_time_steps) > 1:
-        print("❌ Warning: Not all files have the same number of time steps!")
-        for i, ds in enumerate(anomaly_files):
-            print(f"File {i}: {len(ds.time)} time steps")
-
-    combined_ds = xr.concat(anomaly_files, dim="initialization")
-
-    combined_ds = combined_ds.assign_coords(
-        initialization=("initialization", years))
-
-    print(
-        f"📊 Updated initialization values:"
-        f" {combined_ds.initialization.values}")
-
-    combined_ds.initialization.attrs["units"] = "year"
-
-    print(f"📊 Combined dataset dimensions: {combined_ds.dims}")
-    print(f"📊 Combined dataset shape: {combined_ds[variable].shape}")
-
-    n_initializations = len(files)
-    n_lead_times = len(
-        anomaly_files[0].time
+    data_4d = None
+    opened = []
+    # Read the climatology once here instead of once per input file; the
+    # small (12, lat, lon) array is handed to every file.
+    clim_by_month = (
+        load_climatology(adjusted_climatology, variable)
+        if subtract_clim else None
     )
 
-    ds_4d = reorganize_to_4d(
-        combined_ds,
-        variable,
-        n_initializations,
-        n_lead_times)
-
-    ds_4d = ds_4d.assign_coords(initialization=("initialization", years))
+    if lazy:
+        # Fuse opening, climatology subtraction and concatenation into one
+        # dask graph: the stacked cube is never held in memory, to_netcdf
+        # streams it chunk by chunk from the inputs.
+        logger.info("🔄 Opening files")
+        combined = xr.open_mfdataset(
+            files,
+            preprocess=partial(
+                _preprocess_lazy,
+                variable=variable,
+                clim_by_month=clim_by_month,
+            ),
+            combine="nested",
+            concat_dim="initialization",
+            # All files share one grid, so skip aligning their coordinates
+            join="override",
+            coords="minimal",
+            compat="override",
+            parallel=True,
+            engine=engine,
+            **_OPEN_KWARGS,
+        )
+        opened.append(combined)
+
+        years = combined.initialization.values.tolist()
+        # Anomalies are computed a year at a time; join each initialization
+        # back into one block so every output chunk is written only once.
+        # Cast to float32 like the eager cube, so both modes chunk alike.
+        data_4d = combined[variable].data.rechunk({1: -1}).astype(
+            np.float32, copy=False
+        )
+        n_lead_times = data_4d.shape[1]
+        lat, lon = combined.lat, combined.lon
+    else:
+        # Files are independent, so load them in separate processes (netCDF4
+        # reads are serialised by xarray's HDF5 lock within one process) and
+        # copy each result into its slab as it arrives.
+        load_one = partial(
+            _load_one,
+            variable=variable,
+            clim_by_month=clim_by_month,
+            engine=engine,
+        )
 
-    ds_4d.initialization.attrs["units"] = "year"
+        if max_workers is None:
+            # Never start more processes than there are files to load
+            max_workers = min(len(files), os.cpu_count() or 1)
+
+        logger.info("🔄 Processing files")
+        with ExitStack() as stack:
+            # A single worker or file gains nothing from a pool: load in
+            # this process and skip starting another interpreter.
+            load_all = map
+            if max_workers > 1 and len(files) > 1:
+                # Spawn fresh workers instead of forking: the workers
+                # evaluate dask graphs, and a forked child inherits any dask
+                # scheduler lock held by a thread of the parent (e.g. after
+                # an earlier compute) and hangs on it.
+                load_all = stack.enter_context(
+                    ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                ).map
+            results = tqdm(
+                load_all(load_one, files),
+                total=len(files),
+                desc="Processing files",
+                unit="file",
+            )
+            n_steps_per_file = []
+            for i, (year, data, lat, lon) in enumerate(results):
+                n_steps = data.shape[0]
+                if data_4d is None:
+                    # Size the 4D output from the first file and copy every
+                    # file straight into its initialization slab. The cube
+                    # is written as float32, so raw float64 input is cast
+                    # on the copy instead of being held at double width.
+                    n_lead_times = n_steps
+                    data_4d = np.empty(
+                        (len(files), n_lead_times, lat.size, lon.size),
+                        dtype=np.float32,
+                    )
+                elif n_steps > n_lead_times:
+                    # A longer file: grow the lead time axis (rare, so one
+                    # copy is cheap) and pad the files copied so far.
+                    grown = np.empty(
+                        (len(files), n_steps) + data_4d.shape[2:],
+                        dtype=np.float32,
+                    )
+                    grown[:i, :n_lead_times] = data_4d[:i]
+                    grown[:i, n_lead_times:] = np.nan
+                    data_4d, n_lead_times = grown, n_steps
+
+                data_4d[i, :n_steps] = data
+                # Only pad what is missing instead of prefilling the whole cube
+                data_4d[i, n_steps:] = np.nan
+                n_steps_per_file.append(n_steps)
+                years.append(year)
+
+            for file, n_steps in zip(files, n_steps_per_file):
+                if n_steps != n_lead_times:
+                    logger.warning(
+                        "❌ %s has %d time steps, expected %d!",
+                        file, n_steps, n_lead_times,
+                    )
+
+    logger.info("📊 Extracted years: %s", years)
 
-    ds_4d = ds_4d.set_coords("initialization")
+    ds_4d = xr.Dataset(
+        {variable: (("initialization", "lead_time", "lat", "lon"), data_4d)},
+        coords={
+            "initialization": ("initialization", years, {"units": "year"}),
+            "lead_time": np.arange(n_lead_times),
+            "lat": lat,
+            "lon": lon,
+        },
+    )
 
-    print(f"📊 Final initialization values: {ds_4d.initialization.values}")
-    print(
-        "📊 Final initialization units",
-        f" : {ds_4d.initialization.attrs.get('units', 'N/A')}"
+    logger.debug("📊 Final dataset dimensions: %s", ds_4d.sizes)
+    logger.debug("📊 Final dataset shape: %s", ds_4d[variable].shape)
+    logger.debug(
+        "📊 Final initialization values: %s", ds_4d.initialization.values
+    )
+    logger.debug(
+        "📊 Final initialization units: %s",
+        ds_4d.initialization.attrs.get("units", "N/A"),
     )
 
-    ds_4d.to_netcdf(output_file)
-    print(f"✅ Processed data saved to {output_file}")
+    if time_last:
+        # Lead time innermost: per-grid-point time series analyses then read
+        # contiguous bytes.
+        ds_4d = ds_4d.transpose("initialization", "lat", "lon", "lead_time")
+    if chunksizes is None:
+        # Chunks keep all lead times of one initialization
+        # Sized for the float32 data that is written, whatever the input
+        chunksizes = _output_chunksizes(
+            n_lead_times, lat.size, lon.size, np.dtype(np.float32).itemsize
+        )
+        if time_last:
+            chunksizes = (
+                chunksizes[0], chunksizes[2], chunksizes[3], chunksizes[1]
+            )
 
-    if cleanup:
-        print("🧹 Cleaning up intermediate files...")
-        for file in anomaly_files:
-            os.remove(file)
-        if subtract_clim:
-            os.remove(adjusted_climatology)
-        print("✅ Intermediate files removed.")
+    # Store float32, compress (byte-shuffled zlib) and keep at most one
+    # initialization per chunk, so later readers (e.g. the plotting) can
+    # fetch single initializations cheaply. Level 1 gets most of the size
+    # reduction of shuffled float32 at a fraction of the cost of level 4+.
+    encoding = {
+        variable: {
+            "zlib": True,
+            "complevel": complevel,
+            "shuffle": True,
+            "dtype": "float32",
+            "chunksizes": chunksizes,
+        }
+    }
+    ds_4d.to_netcdf(output_file, encoding=encoding, engine="netcdf4")
+    for ds in opened:
+        ds.close()
+    logger.info("✅ Processed data saved to %s", output_file)
+
+    if clear_cache and adjusted_climatology is not None:
+        for cached in (adjusted_climatology, weights_file):
+            # Skip files another run sharing the cache already removed
+            if os.path.exists(cached):
+                os.remove(cached)
+                logger.info("🧹 Removed cached file %s", cached)
@@ -1,7 +1,25 @@
 """Utility functions for processing climate data."""
 
 import os
-from typing import List
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Optional
+
+
+def _scan_directory(directory: str) -> Optional[Dict[str, bool]]:
+    """
+    Lists `directory` once, mapping every entry name to whether it is a
+    symbolic link.
+    - Returns an empty mapping for a missing directory, and None when the
+      directory cannot be listed (e.g. execute-only data pools), where
+      files can still exist and must be checked one by one.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name: entry.is_symlink() for entry in entries}
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+    except OSError:
+        return None
 
 
 def validate_files(files: List[str]) -> None:
@@ -15,8 +33,27 @@ def validate_files(files: List[str]) -> None:
         FileNotFoundError: If any file does not exist.
         ValueError: If any file is not a NetCDF file.
     """
+    # Check the names first, before touching the file system
     for file in files:
         if not file.endswith(".nc"):
             raise ValueError(f"File {file} is not a NetCDF file.")
-        if not os.path.exists(file):
-            raise FileNotFoundError(f"File {file} does not exist.")
+
+    # One directory scan per parent directory instead of one stat per file
+    by_directory: DefaultDict[str, List[str]] = defaultdict(list)
+    for file in files:
+        by_directory[os.path.dirname(file) or os.curdir].append(file)
+
+    for directory, dir_files in by_directory.items():
+        entries = _scan_directory(directory)
+        for file in dir_files:
+            if entries is None:
+                exists = os.path.exists(file)
+            else:
+                is_symlink = entries.get(os.path.basename(file))
+                # Only requested symlinks are resolved, so broken links
+                # count as missing, as with `os.path.exists`
+                exists = is_symlink is not None and (
+                    not is_symlink or os.path.exists(file)
+                )
+            if not exists:
+                raise FileNotFoundError(f"File {file} does not exist.")
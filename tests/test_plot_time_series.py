@@ -0,0 +1,98 @@
+import numpy as np
+import xarray as xr
+
+import src.plot_time_series
+from src.plot_time_series import (compute_field_mean_tas,
+                                  plot_global_mean_tas_from_array)
+
+
+def _baseline_mean_line(fldmean_tas, num_lead_years):
+    """
+    The overlay mean line as the original dict-of-lists implementation
+    computed it: every complete 12-month block of the first
+    `num_lead_years` lead years, averaged per month where N > 2.
+    """
+    monthly_values = {}
+    for init_year in fldmean_tas["initialization"].values:
+        series = fldmean_tas.sel(initialization=init_year).values
+        for block_start in range(
+            0, min(len(series), num_lead_years * 12), 12
+        ):
+            tas_block = series[block_start:block_start + 12]
+            if len(tas_block) < 12:
+                continue
+            year = int(init_year) + block_start // 12
+            for month_idx, value in enumerate(tas_block):
+                monthly_values.setdefault(year + month_idx / 12, []).append(
+                    value
+                )
+
+    points = sorted(
+        (time, np.mean(values))
+        for time, values in monthly_values.items()
+        if len(values) > 2
+    )
+    return np.array([x for x, _ in points]), np.array([y for _, y in points])
+
+
+def test_compute_field_mean_tas_split_grid(tmp_path):
+    """
+    Test that `compute_field_mean_tas` reduces files whose lat/lon are
+    split into several chunks on disk, as `process_files` writes them for
+    large grids.
+    """
+    file = tmp_path / "cube.nc"
+    rng = np.random.default_rng(0)
+    tas = rng.random((2, 24, 6, 8), dtype=np.float32)
+    xr.Dataset(
+        {"tas": (["initialization", "lead_time", "lat", "lon"], tas)},
+        coords={
+            "initialization": [1990, 1991],
+            "lead_time": np.arange(24),
+            "lat": np.linspace(-75, 75, 6),
+            "lon": np.linspace(0, 315, 8),
+        },
+    ).to_netcdf(file, encoding={"tas": {"chunksizes": (1, 24, 3, 4)}})
+
+    fldmean = compute_field_mean_tas(str(file), num_lead_years=1)
+
+    assert fldmean.dims == ("initialization", "lead_time")
+    np.testing.assert_allclose(
+        fldmean.values, tas[:, :12].mean(axis=(-2, -1)), rtol=1e-6
+    )
+
+
+def test_plot_mean_line_matches_baseline(tmp_path, monkeypatch):
+    """
+    Test that the overlay mean line of `plot_global_mean_tas_from_array`
+    matches the original per-month averaging, with unevenly spaced
+    initializations and an incomplete final lead year.
+    """
+    rng = np.random.default_rng(0)
+    # 3 complete lead years and 5 months of a fourth
+    fldmean = xr.DataArray(
+        rng.random((6, 41)),
+        dims=("initialization", "lead_time"),
+        coords={"initialization": [1990, 1991, 1992, 1994, 1995, 1998]},
+    )
+    plotted = []
+    real_plot = src.plot_time_series.plt.plot
+
+    def record_plot(x, y, *args, **kwargs):
+        plotted.append((np.asarray(x), np.asarray(y), kwargs.get("label")))
+        return real_plot(x, y, *args, **kwargs)
+
+    monkeypatch.setattr(src.plot_time_series.plt, "plot", record_plot)
+
+    for num_lead_years in (3, 11):
+        plotted.clear()
+        plot_global_mean_tas_from_array(
+            fldmean, num_lead_years, str(tmp_path / f"{num_lead_years}.png")
+        )
+
+        (mean_x, mean_y, label), = plotted
+        expected_x, expected_y = _baseline_mean_line(fldmean, num_lead_years)
+        assert label == "Mean (if N > 2)"
+        assert len(expected_x) > 0
+        np.testing.assert_allclose(mean_x, expected_x)
+        np.testing.assert_allclose(mean_y, expected_y)
@@ -1,9 +1,81 @@
+import os
+import shutil
+
 import numpy as np
 import pandas as pd
 import pytest
 import xarray as xr
 
-from src.processor import process_files  # Ensure correct import
+import src.processor
+from src.processor import extract_years_from_file, process_files
+
+N_LAT, N_LON = 4, 5
+
+
+def _write_hindcasts(directory, first_years, n_time=14):
+    """
+    Writes one synthetic hindcast per initialization year, with a
+    'months since YYYY-11-01' time axis like the model output.
+    """
+    directory.mkdir(exist_ok=True)
+    rng = np.random.default_rng(0)
+    for year in first_years:
+        ds = xr.Dataset(
+            {
+                "tas": (
+                    ["time", "lat", "lon"],
+                    rng.random((n_time, N_LAT, N_LON), dtype=np.float32),
+                )
+            },
+            coords={
+                "time": (
+                    "time",
+                    np.arange(n_time, dtype=np.float64),
+                    {"units": f"months since {year}-11-01"},
+                ),
+                "lat": np.linspace(-60, 60, N_LAT),
+                "lon": np.linspace(0, 288, N_LON),
+            },
+        )
+        ds.to_netcdf(directory / f"tas_Amon_x_{year}11-{year + 1}12.nc")
+
+
+def _write_climatology(file):
+    """Writes a 12-month climatology on the hindcast grid."""
+    xr.Dataset(
+        {
+            "tas": (
+                ["time", "lat", "lon"],
+                np.arange(12 * N_LAT * N_LON, dtype=np.float32).reshape(
+                    12, N_LAT, N_LON
+                ),
+            )
+        },
+        coords={
+            "time": pd.date_range("2000-01-01", periods=12, freq="MS"),
+            "lat": np.linspace(-60, 60, N_LAT),
+            "lon": np.linspace(0, 288, N_LON),
+        },
+    ).to_netcdf(file)
+
+
+@pytest.fixture
+def adjust_calls(monkeypatch):
+    """
+    Replaces the CDO regridding with a copy (the test climatology is
+    already on the hindcast grid), writes empty weights and records every
+    call.
+    """
+    calls = []
+
+    def fake_adjust(climatology_file, reference_file, output_file, **kw):
+        calls.append(reference_file)
+        shutil.copy(climatology_file, output_file)
+        if not os.path.exists(kw["weights_file"]):
+            open(kw["weights_file"], "wb").close()
+
+    monkeypatch.setattr(src.processor, "adjust_climatology", fake_adjust)
+    return calls
 
 
 @pytest.mark.parametrize(
@@ -76,3 +148,465 @@ def test_process_files(
     assert (output_ds["lead_year"].values >= 1).all(), "years should be +"
 
     print("✅ Test passed successfully!")
+
+
+def test_extract_years_from_file_name():
+    """
+    Test that `extract_years_from_file` reads the period from CMOR-style
+    file names without touching the file.
+    """
+    file = "tas_Amon_MPI-ESM-LR_dkfen42019_r7i2p1_201911-203912.nc"
+
+    years = extract_years_from_file(file)
+
+    assert years[0] == 2019
+    assert years[-1] == 2039
+    assert len(years) == 21
+
+
+def test_extract_years_from_file_time_axis(tmp_path):
+    """
+    Test that `extract_years_from_file` reads the years from the time axis
+    of files without a period in their name.
+    """
+    file = tmp_path / "tas_no_period.nc"
+    xr.Dataset(
+        {"tas": (["time"], np.random.rand(14))},
+        coords={"time": pd.date_range("2019-11-01", periods=14, freq="MS")},
+    ).to_netcdf(file)
+
+    years = extract_years_from_file(str(file))
+
+    assert years == [2019, 2020]
+
+
+def test_process_files_lazy_subtracts_climatology(tmp_path, adjust_calls):
+    """
+    Test that `process_files(lazy=True)` writes the monthly anomalies
+    under the input variable name.
+    """
+    _write_hindcasts(tmp_path / "in", [1990, 1991])
+    clim_file = tmp_path / "clim.nc"
+    _write_climatology(clim_file)
+    output_file = tmp_path / "lazy.nc"
+
+    process_files(
+        output_file=str(output_file),
+        output_dir=str(tmp_path / "work"),
+        variable="tas",
+        input_directory=str(tmp_path / "in"),
+        climatology_file=str(clim_file),
+        lazy=True,
+    )
+
+    out = xr.open_dataset(output_file)
+    first = xr.open_dataset(
+        tmp_path / "in" / "tas_Amon_x_199011-199112.nc", decode_times=False
+    )
+    clim = xr.open_dataset(clim_file)["tas"].values
+
+    # Time steps start in November
+    months = (10 + np.arange(14)) % 12
+    expected = first["tas"].values - clim[months]
+    assert out["tas"].dims == ("initialization", "lead_time", "lat", "lon")
+    assert out["initialization"].values.tolist() == [1990, 1991]
+    np.testing.assert_allclose(out["tas"].values[0], expected, rtol=1e-6)
+
+
+def test_extract_years_from_file_months_since(tmp_path):
+    """
+    Test that `extract_years_from_file` decodes 'months since' axes on
+    their own calendar, like `cdo showyear`.
+    """
+    file = tmp_path / "tas_months_since.nc"
+    xr.Dataset(
+        {"tas": (["time"], np.random.rand(122))},
+        coords={
+            "time": (
+                "time",
+                np.arange(122, dtype=np.float64),
+                {"units": "months since 1960-01-01"},
+            )
+        },
+    ).to_netcdf(file)
+
+    years = extract_years_from_file(str(file))
+
+    assert years == list(range(1960, 1971))
+
+
+@pytest.mark.parametrize("subtract_clim", [True, False])
+def test_process_files_lazy_matches_eager(
+    tmp_path, adjust_calls, subtract_clim
+):
+    """
+    Test that the lazy and the eager path write the same cube, with and
+    without climatology subtraction.
+    """
+    _write_hindcasts(tmp_path / "in", [1990, 1991, 1992])
+    clim_file = tmp_path / "clim.nc"
+    _write_climatology(clim_file)
+
+    outputs = {}
+    for lazy in (False, True):
+        outputs[lazy] = tmp_path / f"out_{lazy}.nc"
+        process_files(
+            output_file=str(outputs[lazy]),
+            output_dir=str(tmp_path / "work"),
+            variable="tas",
+            input_directory=str(tmp_path / "in"),
+            climatology_file=str(clim_file) if subtract_clim else None,
+            subtract_clim=subtract_clim,
+            max_workers=2,
+            lazy=lazy,
+        )
+
+    eager = xr.open_dataset(outputs[False])
+    lazy = xr.open_dataset(outputs[True])
+    xr.testing.assert_identical(eager, lazy)
+    assert eager["tas"].encoding["chunksizes"] == (
+        lazy["tas"].encoding["chunksizes"]
+    )
+    assert eager["tas"].shape == (3, 14, N_LAT, N_LON)
+
+
+def test_process_files_reuses_adjusted_climatology(tmp_path, adjust_calls):
+    """
+    Test that the adjusted climatology is regridded once and reused by
+    later runs on the same grid, also with `cleanup=True`.
+    """
+    _write_hindcasts(tmp_path / "in", [1990, 1991])
+    clim_file = tmp_path / "clim.nc"
+    _write_climatology(clim_file)
+    kwargs = dict(
+        output_dir=str(tmp_path / "work"),
+        variable="tas",
+        input_directory=str(tmp_path / "in"),
+        climatology_file=str(clim_file),
+        lazy=True,
+    )
+
+    with pytest.warns(DeprecationWarning, match="clear_cache"):
+        process_files(
+            output_file=str(tmp_path / "a.nc"), cleanup=True, **kwargs
+        )
+    process_files(output_file=str(tmp_path / "b.nc"), **kwargs)
+    assert len(adjust_calls) == 1
+
+    process_files(
+        output_file=str(tmp_path / "c.nc"), clear_cache=True, **kwargs
+    )
+    assert not list((tmp_path / "work").glob("*climatology*"))
+    assert not list((tmp_path / "work").glob("bilweights_*"))
+    process_files(output_file=str(tmp_path / "d.nc"), **kwargs)
+    assert len(adjust_calls) == 2
+
+
+def test_cache_key_shared_by_grid(tmp_path):
+    """
+    Test that the regridding cache key only depends on the grid of the
+    reference file, so other initializations and members share weights.
+    """
+    _write_hindcasts(tmp_path / "in", [1990, 1991])
+    clim_file = tmp_path / "clim.nc"
+    _write_climatology(clim_file)
+
+    keys = {
+        src.processor._cache_key(str(clim_file), str(file))
+        for file in (tmp_path / "in").iterdir()
+    }
+
+    assert len(keys) == 1
+
+
+def test_process_files_time_last(tmp_path, adjust_calls):
+    """
+    Test that `time_last=True` writes lead time innermost, keeping all
+    lead times of one initialization per chunk.
+    """
+    _write_hindcasts(tmp_path / "in", [1990, 1991])
+    output_file = tmp_path / "out.nc"
+
+    process_files(
+        output_file=str(output_file),
+        output_dir=str(tmp_path / "work"),
+        variable="tas",
+        input_directory=str(tmp_path / "in"),
+        subtract_clim=False,
+        max_workers=1,
+        time_last=True,
+    )
+
+    out = xr.open_dataset(output_file)
+    assert out["tas"].dims == ("initialization", "lat", "lon", "lead_time")
+    assert out["tas"].encoding["chunksizes"] == (1, N_LAT, N_LON, 14)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("subtract_clim", [True, False])
+def test_process_files_calendar_initialization_year(
+    tmp_path, adjust_calls, subtract_clim, lazy
+):
+    """
+    Test that initializations are labelled with the real calendar year of
+    their first time step, like `extract_years_from_file`, even where the
+    November shift of the months moves it into the next year.
+    """
+    directory = tmp_path / "in"
+    directory.mkdir()
+    file = directory / "tas_no_period.nc"
+    xr.Dataset(
+        {"tas": (["time", "lat", "lon"], np.ones((14, N_LAT, N_LON)))},
+        coords={
+            "time": (
+                "time",
+                np.arange(10, 24, dtype=np.float64),
+                {"units": "months since 1960-01-01"},
+            ),
+            "lat": np.linspace(-60, 60, N_LAT),
+            "lon": np.linspace(0, 288, N_LON),
+        },
+    ).to_netcdf(file)
+    clim_file = tmp_path / "clim.nc"
+    _write_climatology(clim_file)
+    output_file = tmp_path / "out.nc"
+
+    process_files(
+        output_file=str(output_file),
+        output_dir=str(tmp_path / "work"),
+        variable="tas",
+        input_directory=str(directory),
+        climatology_file=str(clim_file) if subtract_clim else None,
+        subtract_clim=subtract_clim,
+        lazy=lazy,
+    )
+
+    out = xr.open_dataset(output_file)
+    assert extract_years_from_file(str(file))[0] == 1960
+    assert out["initialization"].values.tolist() == [1960]
+
+
+def test_adjusted_climatology_dotted_output_dir(tmp_path, adjust_calls):
+    """
+    Test that the cached climatology is written into output directories
+    whose names contain '.nc'.
+    """
+    _write_hindcasts(tmp_path / "in", [1990])
+    clim_file = tmp_path / "clim.nc"
+    _write_climatology(clim_file)
+    output_dir = tmp_path / "runs.nc_out"
+    output_dir.mkdir()
+
+    adjusted, weights = src.processor._adjusted_climatology(
+        str(clim_file),
+        str(tmp_path / "in" / "tas_Amon_x_199011-199112.nc"),
+        str(output_dir),
+    )
+
+    assert os.path.dirname(adjusted) == str(output_dir)
+    assert sorted(os.listdir(output_dir)) == sorted(
+        [os.path.basename(adjusted), os.path.basename(weights)]
+    )
+
+
+def test_process_files_cleanup_keeps_other_files(tmp_path, adjust_calls):
+    """
+    Test that `cleanup=True` leaves files it did not write in output_dir,
+    and that a failed climatology adjustment leaves no partial file.
+    """
+    _write_hindcasts(tmp_path / "in", [1990])
+    clim_file = tmp_path / "clim.nc"
+    _write_climatology(clim_file)
+    output_dir = tmp_path / "work"
+    output_dir.mkdir()
+    (output_dir / "user.part.nc").write_bytes(b"")
+
+    with pytest.warns(DeprecationWarning):
+        process_files(
+            output_file=str(tmp_path / "out.nc"),
+            output_dir=str(output_dir),
+            variable="tas",
+            input_directory=str(tmp_path / "in"),
+            climatology_file=str(clim_file),
+            cleanup=True,
+        )
+    assert (output_dir / "user.part.nc").exists()
+
+    def failing_write(path):
+        open(path, "wb").close()
+        raise RuntimeError("interrupted")
+
+    with pytest.raises(RuntimeError):
+        src.processor._write_atomically(
+            str(output_dir / "never.nc"), failing_write
+        )
+    assert not (output_dir / "never.nc").exists()
+    assert not [n for n in os.listdir(output_dir) if n.startswith(".partial")]
+
+
+def test_process_files_single_worker_loads_in_process(
+    tmp_path, monkeypatch
+):
+    """
+    Test that `process_files` starts no worker processes for one worker
+    or one file, so scripts without a `__main__` guard keep working.
+    """
+    def no_pool(*args, **kwargs):
+        raise AssertionError("no process pool expected")
+
+    monkeypatch.setattr(src.processor, "ProcessPoolExecutor", no_pool)
+    _write_hindcasts(tmp_path / "in", [1990, 1991])
+    _write_hindcasts(tmp_path / "one", [1990])
+    kwargs = dict(
+        output_dir=str(tmp_path / "work"),
+        variable="tas",
+        subtract_clim=False,
+    )
+
+    process_files(
+        output_file=str(tmp_path / "a.nc"),
+        input_directory=str(tmp_path / "in"),
+        max_workers=1,
+        **kwargs,
+    )
+    process_files(
+        output_file=str(tmp_path / "b.nc"),
+        input_directory=str(tmp_path / "one"),
+        **kwargs,
+    )
+
+    assert xr.open_dataset(tmp_path / "a.nc")["tas"].shape[0] == 2
+    assert xr.open_dataset(tmp_path / "b.nc")["tas"].shape[0] == 1
+
+
+@pytest.mark.parametrize("short_year", [1990, 1991])
+def test_process_files_pads_short_files(tmp_path, short_year):
+    """
+    Test that files with fewer time steps are NaN-padded to the longest
+    file, whether the short file sorts first or last.
+    """
+    for year in (1990, 1991):
+        _write_hindcasts(
+            tmp_path / "in", [year], n_time=12 if year == short_year else 14
+        )
+    output_file = tmp_path / "out.nc"
+
+    process_files(
+        output_file=str(output_file),
+        output_dir=str(tmp_path / "work"),
+        variable="tas",
+        input_directory=str(tmp_path / "in"),
+        subtract_clim=False,
+        max_workers=1,
+    )
+
+    tas = xr.open_dataset(output_file)["tas"]
+    short = tas.sel(initialization=short_year).values
+    assert tas.shape == (2, 14, N_LAT, N_LON)
+    assert np.isnan(short[12:]).all()
+    assert not np.isnan(short[:12]).any()
+
+
+@pytest.mark.parametrize("n_found", [0, 1])
+def test_process_files_freva_search(
+    tmp_path, monkeypatch, adjust_calls, n_found
+):
+    """
+    Test the Freva search path of `process_files`, which regrids the
+    climatology on the first file found while the search continues.
+    """
+    _write_hindcasts(tmp_path / "in", [1990])
+    found = [str(tmp_path / "in" / "tas_Amon_x_199011-199112.nc")][:n_found]
+    monkeypatch.setattr(
+        src.processor.freva, "databrowser", lambda **kwargs: iter(found)
+    )
+    clim_file = tmp_path / "clim.nc"
+    _write_climatology(clim_file)
+    output_file = tmp_path / "out.nc"
+
+    process_files(
+        output_file=str(output_file),
+        output_dir=str(tmp_path / "work"),
+        experiment="dkfen4*",
+        project="comingdecade",
+        time_frequency="mon",
+        variable="tas",
+        ensemble="r26i2p1",
+        climatology_file=str(clim_file),
+    )
+
+    assert adjust_calls == found
+    assert output_file.exists() == bool(found)
+    if found:
+        out = xr.open_dataset(output_file)
+        assert out["initialization"].values.tolist() == [1990]
+
+
+def test_adjust_climatology_xesmf_reuses_weights(tmp_path):
+    """
+    Test that the xESMF backend writes its bilinear weights once and that
+    a second regridding reuses them with identical output.
+    """
+    pytest.importorskip("xesmf")
+    _write_hindcasts(tmp_path / "in", [1990])
+    reference = str(tmp_path / "in" / "tas_Amon_x_199011-199112.nc")
+    clim_file = tmp_path / "clim.nc"
+    xr.Dataset(
+        {"tas": (["time", "lat", "lon"], np.ones((12, 7, 9), np.float32))},
+        coords={
+            "time": pd.date_range("2000-01-01", periods=12, freq="MS"),
+            "lat": np.linspace(-90, 90, 7),
+            "lon": np.linspace(0, 320, 9),
+        },
+    ).to_netcdf(clim_file)
+    work = tmp_path / "work"
+    work.mkdir()
+
+    src.processor.adjust_climatology(
+        str(clim_file), reference, str(work / "a.nc"), backend="xesmf"
+    )
+    (weights,) = work.glob("xesmf_bilinear_*.nc")
+    written = weights.stat().st_mtime_ns
+    src.processor.adjust_climatology(
+        str(clim_file), reference, str(work / "b.nc"), backend="xesmf"
+    )
+
+    assert list(work.glob("xesmf_bilinear_*.nc")) == [weights]
+    assert weights.stat().st_mtime_ns == written
+    xr.testing.assert_identical(
+        xr.open_dataset(work / "a.nc"), xr.open_dataset(work / "b.nc")
+    )
+
+
+def test_process_files_freva_search_error_joins_regrid(
+    tmp_path, monkeypatch, adjust_calls
+):
+    """
+    Test that a Freva search failing after the first file still waits for
+    the background regrid instead of leaving it running detached.
+    """
+    _write_hindcasts(tmp_path / "in", [1990])
+    first = str(tmp_path / "in" / "tas_Amon_x_199011-199112.nc")
+
+    def failing_search(**kwargs):
+        yield first
+        raise RuntimeError("databrowser failed")
+
+    monkeypatch.setattr(src.processor.freva, "databrowser", failing_search)
+    clim_file = tmp_path / "clim.nc"
+    _write_climatology(clim_file)
+
+    with pytest.raises(RuntimeError, match="databrowser failed"):
+        process_files(
+            output_file=str(tmp_path / "out.nc"),
+            output_dir=str(tmp_path / "work"),
+            experiment="dkfen4*",
+            project="comingdecade",
+            time_frequency="mon",
+            variable="tas",
+            ensemble="r26i2p1",
+            climatology_file=str(clim_file),
+        )
+
+    assert adjust_calls == [first]
+    assert list((tmp_path / "work").glob("adjusted_climatology_*.nc"))
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 
 from src.utils import validate_files
@@ -17,3 +19,31 @@ def test_validate_files(tmp_path):
 
     with pytest.raises(ValueError):
         validate_files([str(tmp_path / "test.txt")])
+
+
+def test_validate_files_symlinks(tmp_path):
+    target = tmp_path / "target.nc"
+    target.touch()
+    (tmp_path / "link.nc").symlink_to(target)
+    (tmp_path / "broken.nc").symlink_to(tmp_path / "missing.nc")
+
+    validate_files([str(tmp_path / "link.nc")])
+
+    with pytest.raises(FileNotFoundError):
+        validate_files([str(tmp_path / "broken.nc")])
+
+
+def test_validate_files_unlistable_directory(tmp_path, monkeypatch):
+    # Execute-only directories cannot be listed, but their files exist
+    file = tmp_path / "test.nc"
+    file.touch()
+
+    def deny(path):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(os, "scandir", deny)
+
+    validate_files([str(file)])
+
+    with pytest.raises(FileNotFoundError):
+        validate_files([str(tmp_path / "nonexistent.nc")])